@@ -7,14 +7,23 @@
 此版本確保所有方法均已完整實現，無任何省略。
 """
 import pandas as pd
+import numpy as np
 import os
 import re
+import stat
 import itertools
 import time
+import hashlib
+import tempfile
 import logging
 import math
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
+from multiprocessing import shared_memory
+from multiprocessing.pool import Pool
 from enum import Enum, auto
-from typing import List, Optional, Set, FrozenSet, TextIO
+from typing import Dict, Iterator, List, Optional, Sequence, Set, FrozenSet, TextIO, Tuple
 
 # --- 檢查並匯入可選的函式庫 ---
 try:
@@ -29,19 +38,201 @@ try:
 except ImportError:
     PYFD_AVAILABLE = False
 
+try:
+    from numba import njit, prange, set_num_threads
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
+try:
+    import pyarrow # pylint: disable=unused-import
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
 # --- 全局日誌設定 ---
 LOG_FILENAME = 'uniquekey_finder.log'
-if os.path.exists(LOG_FILENAME):
-    os.remove(LOG_FILENAME)
 logger = logging.getLogger('UniqueKeyFinder')
 logger.setLevel(logging.INFO)
-file_handler = logging.FileHandler(LOG_FILENAME, encoding='utf-8')
-console_handler = logging.StreamHandler()
-formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
-file_handler.setFormatter(formatter)
-console_handler.setFormatter(formatter)
-logger.addHandler(file_handler)
-logger.addHandler(console_handler)
+
+def setup_logging() -> None:
+    """設定主日誌檔與主控台輸出，並清除上一次執行留下的日誌檔 (只在主行程中呼叫)。"""
+    # 若在匯入時執行，spawn 模式下重新匯入本模組的工作行程會刪除並重開主日誌檔
+    if logger.handlers:
+        return
+    if os.path.exists(LOG_FILENAME):
+        os.remove(LOG_FILENAME)
+    file_handler = logging.FileHandler(LOG_FILENAME, encoding='utf-8')
+    console_handler = logging.StreamHandler()
+    formatter = logging.Formatter('%(asctime)s - %(levelname)s - %(message)s')
+    file_handler.setFormatter(formatter)
+    console_handler.setFormatter(formatter)
+    logger.addHandler(file_handler)
+    logger.addHandler(console_handler)
+
+# 滾動雜湊使用的 64 位元奇數乘數
+HASH_MULTIPLIER = np.uint64(1469598103934665603)
+# super_smart 策略交給 HyFD 歸納相依性時使用的最大樣本列數
+HYFD_SAMPLE_SIZE = 200_000
+# 分塊讀取 CSV 時每一塊的列數
+CSV_CHUNK_SIZE = 2 ** 20
+# 整數代碼快取檔的存放目錄 (僅限擁有者存取)；快取格式變更時需調整版本號，使舊快取自動失效
+CODE_CACHE_DIR = os.path.join(tempfile.gettempdir(), 'keyfinder_code_cache')
+CODE_CACHE_DIR_MODE = 0o700
+CODE_CACHE_FILE_MODE = 0o600
+CODE_CACHE_VERSION = 2
+# 雜湊碰撞的精確確認中，列數不超過此值時使用 np.unique(axis=0)，否則改用 DataFrame.duplicated()
+CONFIRM_NP_UNIQUE_MAX_ROWS = 1000
+# 候選碼數量達到此門檻時，才值得啟動多行程平行測試
+PARALLEL_MIN_CANDIDATES = 64
+# 同一長度的候選碼每次合併計算雜湊的最大數量，以及單批雜湊矩陣允許佔用的記憶體上限
+HASH_BATCH_SIZE = 256
+HASH_BATCH_MAX_BYTES = 64 * 2 ** 20
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _rolling_hash_kernel(code_mat: np.ndarray, col_indices: np.ndarray) -> np.ndarray:
+        """_rolling_hash 的 Numba 版本：各列平行計算，直接讀取代碼矩陣中被選取的欄位。"""
+        n_rows = code_mat.shape[0]
+        n_cands, k = col_indices.shape
+        hashes = np.empty((n_cands, n_rows), dtype=np.uint64)
+        for i in prange(n_rows): # pylint: disable=not-an-iterable
+            for b in range(n_cands):
+                row_hash = np.uint64(0)
+                for j in range(k):
+                    row_hash = row_hash * HASH_MULTIPLIER ^ np.uint64(code_mat[i, col_indices[b, j]])
+                hashes[b, i] = row_hash
+        return hashes
+
+def _is_owner_only(path: str, is_dir: bool) -> bool:
+    """確認路徑是目前使用者擁有、其他使用者無權存取的實體目錄或一般檔案 (不跟隨符號連結)。"""
+    try:
+        path_stat = os.lstat(path)
+    except OSError:
+        return False
+    if not (stat.S_ISDIR(path_stat.st_mode) if is_dir else stat.S_ISREG(path_stat.st_mode)):
+        return False
+    # Windows 沒有 POSIX 擁有者與權限位元，暫存目錄本身已是個人目錄
+    if not hasattr(os, 'getuid'):
+        return True
+    return path_stat.st_uid == os.getuid() and path_stat.st_mode & 0o077 == 0
+
+def _rolling_hash(code_mat: np.ndarray, col_indices: np.ndarray) -> np.ndarray:
+    """以滾動雜湊將 (候選碼數, k) 欄位索引矩陣所選的代碼合併為 (候選碼數, N) 的 uint64 雜湊矩陣。"""
+    if NUMBA_AVAILABLE:
+        return _rolling_hash_kernel(code_mat, col_indices)
+    # code_mat 為 Fortran order，其轉置的每一列即為一個欄位，以欄位索引取列可直接得到連續存放的 (候選碼數, N) 陣列
+    columns = code_mat.T
+    hashes = np.zeros((col_indices.shape[0], code_mat.shape[0]), dtype=np.uint64)
+    for j in range(col_indices.shape[1]):
+        hashes = hashes * HASH_MULTIPLIER ^ columns[col_indices[:, j]].astype(np.uint64)
+    return hashes
+
+def _codes_are_unique(code_mat: np.ndarray, col_indices: Sequence[int]) -> bool:
+    """檢查 column-major 代碼矩陣中指定欄位的組合在所有資料列中是否唯一。"""
+    return _codes_are_unique_batch(code_mat, [col_indices])[0]
+
+def _codes_are_unique_batch(code_mat: np.ndarray, candidates: Sequence[Sequence[int]]) -> List[bool]:
+    """一次檢查多個候選碼 (以欄位索引表示) 的唯一性，依序返回每個候選碼的結果。"""
+    results = [False] * len(candidates)
+    by_length: Dict[int, List[int]] = {}
+    for pos, cand in enumerate(candidates):
+        by_length.setdefault(len(cand), []).append(pos)
+
+    # 相同長度的候選碼合併成一個雜湊矩陣一次排序比較，每批大小受 HASH_BATCH_MAX_BYTES 限制
+    batch_size = max(1, HASH_BATCH_MAX_BYTES // max(1, code_mat.shape[0] * 8))
+    for positions in by_length.values():
+        for start in range(0, len(positions), batch_size):
+            batch = positions[start:start + batch_size]
+            hashes = _rolling_hash(code_mat, np.array([candidates[pos] for pos in batch], dtype=np.int64))
+            sorted_hashes = np.sort(hashes, axis=1)
+            duplicated = sorted_hashes[:, 1:] == sorted_hashes[:, :-1]
+            has_duplicates = duplicated.any(axis=1)
+            for row, pos in enumerate(batch):
+                results[pos] = not has_duplicates[row] or _resolve_hash_duplicates(
+                    code_mat, candidates[pos], hashes[row], sorted_hashes[row], np.flatnonzero(duplicated[row]))
+    return results
+
+def _resolve_hash_duplicates(code_mat: np.ndarray, col_indices: Sequence[int], hashes: np.ndarray,
+                             sorted_hashes: np.ndarray, duplicated: np.ndarray) -> bool:
+    """雜湊值出現重複時判斷候選碼是否仍然唯一；duplicated 為排序後雜湊值與下一個相同的位置。"""
+    # 相同的資料列雜湊值必定相同，但雜湊值相同也可能只是碰撞：先比對第一組重複的兩列，不同時才做精確確認
+    first, second = np.flatnonzero(hashes == sorted_hashes[duplicated[0]])[:2]
+    if all(code_mat[first, i] == code_mat[second, i] for i in col_indices):
+        return False
+    suspect_rows = np.flatnonzero(np.isin(hashes, sorted_hashes[duplicated]))
+    return _confirm_unique(code_mat, col_indices, suspect_rows)
+
+def _confirm_unique(code_mat: np.ndarray, col_indices: Sequence[int], rows: np.ndarray) -> bool:
+    """精確確認指定資料列 (雜湊值重複的列) 在所選欄位上的代碼組合互不相同。"""
+    code_slice = code_mat[np.ix_(rows, col_indices)]
+    # 列數多時 np.unique(axis=0) 的逐列排序成本過高，改用 DataFrame.duplicated() 的雜湊表路徑
+    if len(rows) <= CONFIRM_NP_UNIQUE_MAX_ROWS:
+        return np.unique(code_slice, axis=0).shape[0] == len(rows)
+    return not pd.DataFrame(code_slice).duplicated().any()
+
+def _unrank_combination(n: int, k: int, rank: int) -> Tuple[int, ...]:
+    """返回 n 取 k 的組合中，依字典序編號為 rank 的那一組 (以位置索引表示)。"""
+    combination = []
+    position = 0
+    for i in range(k):
+        while True:
+            count = math.comb(n - position - 1, k - i - 1)
+            if rank < count:
+                break
+            rank -= count
+            position += 1
+        combination.append(position)
+        position += 1
+    return tuple(combination)
+
+def _iter_combinations(n: int, k: int, start: int, stop: int) -> Iterator[Tuple[int, ...]]:
+    """依字典序產生編號介於 [start, stop) 的組合，以後繼運算逐一推進，無需重新計算組合數。"""
+    if start >= stop:
+        return
+    combination = list(_unrank_combination(n, k, start))
+    for _ in range(stop - start):
+        yield tuple(combination)
+        i = k - 1
+        while i >= 0 and combination[i] == n - k + i:
+            i -= 1
+        if i < 0:
+            return
+        combination[i] += 1
+        for j in range(i + 1, k):
+            combination[j] = combination[j - 1] + 1
+
+# --- 平行測試工作行程 ---
+# 每個工作行程在初始化時附加到主行程建立的共享記憶體，之後只接收欄位索引。
+_worker_shm: Optional[shared_memory.SharedMemory] = None
+_worker_codes: Optional[np.ndarray] = None
+
+def _init_worker(shm_name: str, shape: Tuple[int, int]) -> None:
+    """工作行程初始化：以唯讀方式附加到存放整數代碼矩陣的共享記憶體。"""
+    global _worker_shm, _worker_codes # pylint: disable=global-statement
+    # 行程數已與 CPU 核心數相當，Numba 核心只使用單一執行緒
+    if NUMBA_AVAILABLE:
+        set_num_threads(1)
+    _worker_shm = shared_memory.SharedMemory(name=shm_name)
+    _worker_codes = np.ndarray(shape, dtype=np.int32, buffer=_worker_shm.buf, order='F')
+
+def _worker_are_unique(batch: Sequence[Sequence[int]]) -> List[bool]:
+    """在工作行程中批次測試一組候選碼 (以欄位索引表示) 是否唯一。"""
+    return _codes_are_unique_batch(_worker_codes, batch)
+
+def _worker_first_unique(task: Tuple[Sequence[int], int, int, int]) -> Optional[int]:
+    """在工作行程中依字典序測試一個編號區間內的組合，返回第一個唯一鍵的編號。"""
+    col_indices, k, start, stop = task
+    combinations = _iter_combinations(len(col_indices), k, start, stop)
+    rank = start
+    while True:
+        batch = list(itertools.islice(combinations, HASH_BATCH_SIZE))
+        if not batch:
+            return None
+        results = _codes_are_unique_batch(_worker_codes, [[col_indices[i] for i in positions] for positions in batch])
+        if True in results:
+            return rank + results.index(True)
+        rank += len(batch)
 
 class Strategy(Enum):
     """定義可用的唯一鍵探索策略。"""
@@ -56,15 +247,25 @@ class UniqueKeyFinder:
     代表對單一 CSV 檔案的完整分析過程。
     這個類別封裝了載入資料、執行不同策略以及生成報告的所有邏輯。
     """
-    def __init__(self, file_path: str, max_key_length: int = 5):
-        """初始化 UniqueKeyFinder。"""
+    def __init__(self, file_path: str, max_key_length: int = 5, n_jobs: Optional[int] = None, use_cache: bool = True):
+        """初始化 UniqueKeyFinder；n_jobs 預設為 CPU 核心數，use_cache 控制是否重用先前解析出的整數代碼。"""
         self.file_path: str = file_path
         self.filename: str = os.path.basename(file_path)
         self.report_filename: str = f"{os.path.splitext(self.filename)[0]}_uniquekey_report.txt"
         self.max_key_length: int = max_key_length
-        self.df: Optional[pd.DataFrame] = None
+        self.use_cache: bool = use_cache
+        self.encoding: Optional[str] = None
+        self.columns: List[str] = []
         self.total_count: int = 0
+        self._code_mat: Optional[np.ndarray] = None
+        self._nunique_cache: Dict[str, int] = {}
+        self._unique_cache: Dict[FrozenSet[str], bool] = {}
+        self.n_jobs: int = n_jobs or os.cpu_count() or 1
+        self._col_index: Dict[str, int] = {}
+        self._pool: Optional[Pool] = None
+        self._shm: Optional[shared_memory.SharedMemory] = None
         self.sorted_columns: List[str] = []
+        self._col_bit: Dict[str, int] = {}
         self.non_unique_L1: List[str] = []
         self.solutions: List[List[str]] = []
         self.report_file: Optional[TextIO] = None
@@ -74,17 +275,20 @@ class UniqueKeyFinder:
         with open(self.report_filename, 'w', encoding='utf-8') as self.report_file:
             logger.info(f"--- 開始處理檔案: {self.filename} (報告將寫入: {self.report_filename}) ---")
             
-            if not self._load_data() or self.df is None:
+            if not self._load_data():
                 return
 
-            if self._prepare_and_check_single_keys():
-                logger.info(f"單一欄位即為唯一鍵，無需進一步組合。")
-            else:
-                for strategy in strategy_order:
-                    if self._run_strategy(strategy):
-                        break
+            try:
+                if self._prepare_and_check_single_keys():
+                    logger.info(f"單一欄位即為唯一鍵，無需進一步組合。")
                 else:
-                    logger.info(f"所有策略均未能為 '{self.filename}' 找到唯一鍵。")
+                    for strategy in strategy_order:
+                        if self._run_strategy(strategy):
+                            break
+                    else:
+                        logger.info(f"所有策略均未能為 '{self.filename}' 找到唯一鍵。")
+            finally:
+                self._release_workers()
         
         logger.info(f"--- 檔案處理完成: {self.filename} ---")
 
@@ -92,52 +296,237 @@ class UniqueKeyFinder:
         """載入 CSV 檔案，自動處理 utf-8 和 cp950 編碼。"""
         logger.info(f"正在讀取檔案 '{self.filename}' 到記憶體中...")
         self.report_file.write("  (正在讀取檔案...)\n")
+        cache_path = self._code_cache_path()
+        # 在解析前取得檔案資訊，解析期間檔案若被修改，下次讀取時快取即不相符
+        stamp = self._source_stamp() if cache_path else None
+        read_msg = self._load_code_cache(cache_path, stamp) if stamp is not None else None
+        if read_msg is None:
+            read_msg = self._parse_csv()
+            if read_msg is None:
+                return False
+            if stamp is not None and self.total_count > 0:
+                self._save_code_cache(cache_path, stamp)
+        
+        logger.info(read_msg)
+        self.report_file.write(f"  ({read_msg})\n")
+        if self.total_count == 0:
+            logger.warning("檔案為空，無法分析。")
+            self.report_file.write("檔案為空。\n")
+            return False
+        self.report_file.write(f"總筆數: {self.total_count:,}\n\n")
+        return True
+
+    def _parse_csv(self) -> Optional[str]:
+        """解析 CSV 檔案並建立整數代碼，返回讀取結果訊息；讀取失敗時返回 None。"""
         try:
-            self.df = pd.read_csv(self.file_path, dtype=str, on_bad_lines='warn', encoding='utf-8')
+            self._read_codes('utf-8')
             read_msg = "檔案讀取完成 (使用 utf-8)。"
         except UnicodeDecodeError:
             logger.info("utf-8 解碼失敗，轉而嘗試 cp950 編碼...")
             try:
-                self.df = pd.read_csv(self.file_path, dtype=str, on_bad_lines='warn', encoding='cp950')
+                self._read_codes('cp950')
                 read_msg = "檔案讀取完成 (使用 cp950)。"
             except (IOError, pd.errors.ParserError) as e:
                 msg = f"❌ 讀取檔案失敗 (utf-8 和 cp950 均失敗): {e}"
                 logger.error(msg)
                 self.report_file.write(msg + "\n")
-                return False
+                return None
         except (IOError, pd.errors.ParserError) as e:
             msg = f"❌ 讀取檔案時發生錯誤: {e}"
             logger.error(msg)
             self.report_file.write(msg + "\n")
-            return False
-        
-        logger.info(read_msg)
-        self.report_file.write(f"  ({read_msg})\n")
-        self.total_count = len(self.df)
-        if self.total_count == 0:
-            logger.warning("檔案為空，無法分析。")
-            self.report_file.write("檔案為空。\n")
-            return False
-        self.report_file.write(f"總筆數: {self.total_count:,}\n\n")
-        return True
+            return None
+        return read_msg
+
+    def _code_cache_path(self) -> Optional[str]:
+        """依檔案的絕對路徑計算代碼快取檔的位置；停用快取時返回 None。"""
+        if not self.use_cache:
+            return None
+        # 每個路徑只對應一個快取檔，修改時間與大小存放在檔內，檔案變更後舊快取會被覆寫
+        key = os.path.abspath(self.file_path)
+        return os.path.join(CODE_CACHE_DIR, hashlib.sha1(key.encode('utf-8')).hexdigest() + '.npz')
+
+    def _source_stamp(self) -> Optional[np.ndarray]:
+        """返回用來判斷快取是否仍然有效的 [快取格式版本, 修改時間, 大小]；無法取得檔案資訊時返回 None。"""
+        try:
+            file_stat = os.stat(self.file_path)
+        except OSError:
+            return None
+        return np.array([CODE_CACHE_VERSION, file_stat.st_mtime_ns, file_stat.st_size], dtype=np.int64)
+
+    def _load_code_cache(self, cache_path: str, stamp: np.ndarray) -> Optional[str]:
+        """從快取檔載入整數代碼矩陣，完全略過 CSV 解析；快取不存在、已過期、無法讀取或可能被他人置換時返回 None。"""
+        if not os.path.exists(cache_path):
+            return None
+        # 快取檔名與檔案資訊都可由 CSV 推得，目錄或檔案不屬於目前使用者時，內容可能被他人預先放置
+        if not (_is_owner_only(CODE_CACHE_DIR, is_dir=True) and _is_owner_only(cache_path, is_dir=False)):
+            logger.warning(f"代碼快取 '{cache_path}' 不屬於目前使用者或權限過寬，改為重新解析 CSV。")
+            return None
+        try:
+            with np.load(cache_path, allow_pickle=False) as cached:
+                if not np.array_equal(cached['stamp'], stamp):
+                    logger.info("檔案在上次快取後已變更，重新解析 CSV。")
+                    return None
+                code_mat = np.asfortranarray(cached['code_mat'])
+                columns = cached['columns'].tolist()
+                nunique = cached['nunique'].tolist()
+                encoding = str(cached['encoding'])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"代碼快取 '{cache_path}' 無法讀取，改為重新解析 CSV: {e}")
+            return None
+
+        self.encoding = encoding
+        self.columns = columns
+        self.total_count = code_mat.shape[0]
+        self._code_mat = code_mat
+        self._index_code_matrix()
+        self._nunique_cache = dict(zip(columns, nunique))
+        return f"已從快取載入整數代碼 (原始檔案使用 {encoding})。"
+
+    def _save_code_cache(self, cache_path: str, stamp: np.ndarray) -> None:
+        """將整數代碼矩陣寫入只限擁有者存取的快取檔，覆寫同一檔案先前的快取。"""
+        tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+        try:
+            os.makedirs(CODE_CACHE_DIR, mode=CODE_CACHE_DIR_MODE, exist_ok=True)
+            os.chmod(CODE_CACHE_DIR, CODE_CACHE_DIR_MODE)
+            if not _is_owner_only(CODE_CACHE_DIR, is_dir=True):
+                logger.warning(f"代碼快取目錄 '{CODE_CACHE_DIR}' 不屬於目前使用者，不寫入快取。")
+                return
+            # 先寫入暫存檔再改名，避免留下不完整的快取
+            fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC | getattr(os, 'O_BINARY', 0),
+                         CODE_CACHE_FILE_MODE)
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, stamp=stamp, code_mat=self._code_mat, columns=np.array(self.columns, dtype=str),
+                         nunique=np.array([self._nunique_cache[col] for col in self.columns], dtype=np.int64),
+                         encoding=np.array(self.encoding))
+            os.replace(tmp_path, cache_path)
+        except OSError as e:
+            logger.warning(f"無法寫入代碼快取 '{cache_path}': {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def _index_code_matrix(self) -> None:
+        """建立欄位名稱到代碼矩陣欄位的索引；所有欄位存取都經由此索引讀取代碼矩陣，不另建逐欄陣列。"""
+        self._col_index = {col: i for i, col in enumerate(self.columns)}
+
+    def _read_codes(self, encoding: str) -> None:
+        """以指定編碼分塊讀取 CSV，將每個欄位字典編碼為 int32 整數代碼 (缺值自成一個代碼) 並記錄相異值數量。"""
+        # dtype=str 會覆蓋 dtype_backend，必須直接指定 Arrow 字串型別；factorize 在此型別下仍會讓缺值自成一個代碼
+        string_dtype = 'string[pyarrow]' if PYARROW_AVAILABLE else str
+        # 每塊只保留區域代碼與相異值，讀完後合併編碼一次，使總成本與資料列數呈線性
+        uniques_chunks: Dict[str, List[pd.Index]] = {}
+        code_chunks: Dict[str, List[np.ndarray]] = {}
+        with pd.read_csv(self.file_path, dtype=string_dtype, on_bad_lines='warn', encoding=encoding,
+                         chunksize=CSV_CHUNK_SIZE) as reader:
+            for chunk in reader:
+                for col in chunk.columns:
+                    local_codes, local_uniques = pd.factorize(chunk[col], use_na_sentinel=False)
+                    code_chunks.setdefault(col, []).append(local_codes.astype(np.int32))
+                    uniques_chunks.setdefault(col, []).append(pd.Index(local_uniques))
+
+        # 各欄位代碼依序寫入 column-major 矩陣，任意欄位子集都是數個連續的 N 長度陣列
+        self.encoding = encoding
+        self.columns = list(code_chunks)
+        self.total_count = sum(len(chunk) for chunk in code_chunks[self.columns[0]]) if self.columns else 0
+        self._code_mat = np.empty((self.total_count, len(self.columns)), dtype=np.int32, order='F')
+        self._nunique_cache = {}
+        for i, col in enumerate(self.columns):
+            # 依塊的順序串接區域相異值再編碼一次，全域代碼即為各值首次出現的順序
+            local_uniques = uniques_chunks.pop(col)
+            all_uniques = local_uniques[0].append(local_uniques[1:]) if len(local_uniques) > 1 else local_uniques[0]
+            mapping, uniques = pd.factorize(all_uniques, use_na_sentinel=False)
+            mapping = mapping.astype(np.int32)
+            row_start = unique_start = 0
+            for local_codes, chunk_uniques in zip(code_chunks.pop(col), local_uniques):
+                row_stop = row_start + len(local_codes)
+                np.take(mapping[unique_start:unique_start + len(chunk_uniques)], local_codes,
+                        out=self._code_mat[row_start:row_stop, i])
+                row_start, unique_start = row_stop, unique_start + len(chunk_uniques)
+            # 與 Series.nunique() 一致，相異值數量不計入缺值
+            self._nunique_cache[col] = len(uniques) - int(pd.Index(uniques).hasnans)
+        self._index_code_matrix()
+
+    def _is_unique(self, cols: List[str]) -> bool:
+        """檢查指定的欄位組合是否能唯一識別每一筆記錄 (結果依欄位集合快取，跨策略共用)。"""
+        key = frozenset(cols)
+        if key not in self._unique_cache:
+            self._unique_cache[key] = self._check_unique(cols)
+        return self._unique_cache[key]
+
+    def _check_unique(self, cols: List[str]) -> bool:
+        """實際執行唯一性檢查，不經過快取。"""
+        return _codes_are_unique(self._code_mat, [self._col_index[col] for col in cols])
+
+    def _iter_is_unique(self, candidates: Sequence[Sequence[str]]) -> Iterator[bool]:
+        """依序產生每個候選碼的唯一性結果，未快取的候選碼分批計算，數量夠多時分派到工作行程。"""
+        keys = [frozenset(cand) for cand in candidates]
+        pending = list({key: cand for cand, key in zip(candidates, keys) if key not in self._unique_cache}.values())
+        tasks = [[self._col_index[col] for col in cand] for cand in pending]
+        if self.n_jobs > 1 and len(pending) >= PARALLEL_MIN_CANDIDATES:
+            batch_size = max(1, min(HASH_BATCH_SIZE, len(tasks) // (self.n_jobs * 4)))
+            batches = [tasks[i:i + batch_size] for i in range(0, len(tasks), batch_size)]
+            batch_results = self._get_pool().imap(_worker_are_unique, batches)
+        else:
+            batches = (tasks[i:i + HASH_BATCH_SIZE] for i in range(0, len(tasks), HASH_BATCH_SIZE))
+            batch_results = (_codes_are_unique_batch(self._code_mat, batch) for batch in batches)
+        # 批次結果以產生器逐批計算，呼叫端提早中止時不會測試其餘候選碼
+        results = itertools.chain.from_iterable(batch_results)
+
+        for key in keys:
+            if key not in self._unique_cache:
+                is_unique = next(results, None)
+                if is_unique is None:
+                    raise RuntimeError(f"候選碼 {sorted(key)} 的唯一性測試結果遺失。")
+                self._unique_cache[key] = is_unique
+            yield self._unique_cache[key]
+
+    def _get_pool(self) -> Pool:
+        """首次需要時，將整數代碼矩陣放入共享記憶體並建立工作行程池。"""
+        if self._pool is None:
+            shape = self._code_mat.shape
+            self._shm = shared_memory.SharedMemory(create=True, size=max(1, self._code_mat.nbytes))
+            shared_codes = np.ndarray(shape, dtype=np.int32, buffer=self._shm.buf, order='F')
+            shared_codes[:] = self._code_mat
+            # 主行程也改用共享記憶體中的矩陣，避免同時持有兩份代碼
+            self._code_mat = shared_codes
+            logger.info(f"啟動 {self.n_jobs} 個工作行程平行測試候選碼...")
+            # 主行程可能已執行過 Numba 的平行核心，其 tbb/omp 執行緒層在 fork 後會死結，因此以 spawn 建立工作行程
+            self._pool = multiprocessing.get_context('spawn').Pool(
+                self.n_jobs, initializer=_init_worker, initargs=(self._shm.name, shape))
+        return self._pool
+
+    def _release_workers(self, terminate: bool = False) -> None:
+        """關閉工作行程池並釋放共享記憶體；terminate 為 True 時不等待尚未完成的工作。"""
+        if self._pool is not None:
+            if terminate:
+                self._pool.terminate()
+            else:
+                self._pool.close()
+            self._pool.join()
+            self._pool = None
+        if self._shm is not None:
+            # 釋放前先將代碼矩陣複製回私有記憶體，讓後續策略仍可使用
+            self._code_mat = self._code_mat.copy(order='F')
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
 
     def _prepare_and_check_single_keys(self) -> bool:
         """準備分析，計算唯一性比例並檢查單一欄位唯一鍵。"""
-        uniqueness_report = []
-        for col in self.df.columns:
-            unique_count = self.df[col].nunique()
-            uniqueness_report.append({'column': col, 'uniqueness_ratio': unique_count / self.total_count})
-        self.sorted_columns = pd.DataFrame(uniqueness_report).sort_values(by='uniqueness_ratio', ascending=False)['column'].tolist()
+        # 相異值數量已在載入時的字典編碼中取得，這裡不再掃描資料
+        self.sorted_columns = sorted(self.columns, key=lambda col: self._nunique_cache[col], reverse=True)
+        self._col_bit = {col: 1 << i for i, col in enumerate(self.sorted_columns)}
         
         self.report_file.write("--- 步驟 1: 欄位按唯一性比例排序 ---\n" + str(self.sorted_columns) + "\n\n")
         self.report_file.write("--- 步驟 2: 檢查單一欄位 ---\n")
         
-        for col in self.sorted_columns:
-            if self.df[col].nunique() == self.total_count:
-                self.solutions = [[col]]
-                self._log_and_report_success()
-                return True
-            self.non_unique_L1.append(col)
+        # 欄位已按相異值數量遞減排序，若第一個欄位不是唯一鍵，其餘欄位也不可能是
+        best_col = self.sorted_columns[0]
+        if self._nunique_cache[best_col] == self.total_count:
+            self.solutions = [[best_col]]
+            self._log_and_report_success()
+            return True
+        self.non_unique_L1 = list(self.sorted_columns)
             
         self.report_file.write("沒有單一欄位是唯一鍵，開始組合探索...\n\n")
         return False
@@ -167,28 +556,48 @@ class UniqueKeyFinder:
         return False
 
     def _run_strategy_super_smart(self) -> Optional[List[List[str]]]:
-        """使用 pyfd 函式庫執行功能相依性探索。"""
+        """使用 pyfd 函式庫執行功能相依性探索，候選鍵一律在完整資料上重新驗證。"""
         if not PYFD_AVAILABLE:
             logger.error("'pyfd' 函式庫未安裝，無法執行 super_smart 策略。")
             return None
+
+        # 功能相依性只取決於值是否相等，整數代碼 (缺值已自成一個代碼) 即可完整代表原始資料。
+        # 代碼矩陣為 Fortran order，其轉置正是 DataFrame 內部的區塊排列，不抽樣時可直接包裝而不複製
+        if self.total_count > HYFD_SAMPLE_SIZE:
+            rows = np.sort(np.random.default_rng(0).choice(self.total_count, size=HYFD_SAMPLE_SIZE, replace=False))
+            sample = pd.DataFrame(self._code_mat[rows], columns=self.columns)
+            self.report_file.write(f"  (HyFD 使用 {HYFD_SAMPLE_SIZE:,} 筆抽樣資料歸納候選鍵)\n")
+        else:
+            sample = pd.DataFrame(self._code_mat, columns=self.columns, copy=False)
         try:
             logger.info("呼叫 pyfd 引擎進行功能相依性探索...")
-            df_no_na = self.df.fillna('[PYFD_NULL]')
-            fds = hyfd(df_no_na, max_k=self.max_key_length)
-            
-            all_columns = set(self.df.columns)
-            candidate_keys = [list(ant) for ant, dep in fds.items() if set(dep) == all_columns - set(ant)]
-            
-            minimal_keys = []
-            candidate_keys.sort(key=len)
-            for key in candidate_keys:
-                if not any(set(sol).issubset(set(key)) for sol in minimal_keys):
-                    minimal_keys.append(key)
-            return minimal_keys if minimal_keys else None
-        except Exception as e: # pylint: disable=broad-except-clause
+            fds = hyfd(sample, max_k=self.max_key_length)
+        except (ValueError, TypeError, RuntimeError, MemoryError) as e:
             logger.error(f"pyfd 執行時發生錯誤: {e}")
             return None
 
+        # 候選鍵以位元遮罩表示並依位元數遞增排序，已接受的較小鍵若為其子集 (sol & mask == sol) 即可略過
+        all_columns = set(self.columns)
+        candidate_masks = {sum(self._col_bit[col] for col in ant) for ant, dep in fds.items()
+                           if set(dep) == all_columns - set(ant)}
+
+        minimal_masks: List[int] = []
+        rejected = False
+        for mask in sorted(candidate_masks, key=lambda mask: (bin(mask).count('1'), mask)):
+            if any(mask & sol == sol for sol in minimal_masks):
+                continue
+            key = self._mask_to_columns(mask)
+            if self._is_unique(key):
+                minimal_masks.append(mask)
+            else:
+                self.report_file.write(f"    > 捨棄 (在完整資料上不唯一): {key}\n")
+                rejected = True
+        # 被捨棄的候選鍵只在樣本上最小，其超集中可能還有真正的最小鍵，回傳部分結果會漏掉它們
+        if rejected:
+            self.report_file.write("    抽樣歸納的候選鍵未全部通過驗證，結果可能不完整，改由後續策略搜索。\n")
+            return None
+        return [self._mask_to_columns(mask) for mask in minimal_masks] if minimal_masks else None
+
     def _run_strategy_linear(self) -> Optional[List[List[str]]]:
         """執行快速的線性組合策略。"""
         base_combination = []
@@ -198,18 +607,19 @@ class UniqueKeyFinder:
             if len(base_combination) > self.max_key_length: break
             
             logger.info(f"  測試組合: {base_combination}...")
-            if len(self.df[base_combination].drop_duplicates()) == self.total_count:
+            if self._is_unique(base_combination):
                 return [base_combination]
         return None
 
     def _run_strategy_smart(self) -> Optional[List[List[str]]]:
         """執行基於 Apriori 原理的智慧組合策略。"""
-        Lk_minus_1 = {frozenset([col]) for col in self.non_unique_L1}
-        solutions = []
+        # 項目集以整數位元遮罩表示 (第 i 個位元對應 sorted_columns[i])，子集測試只需一次 & 運算
+        Lk_minus_1 = {self._col_bit[col] for col in self.non_unique_L1}
+        solutions: List[int] = []
         for k in range(2, self.max_key_length + 1):
             self.report_file.write(f"\n  >> 正在生成並測試長度為 {k} 的候選碼 <<\n")
             
-            Ck = self._generate_candidates(Lk_minus_1, k)
+            Ck = self._generate_candidates(Lk_minus_1, solutions)
             if not Ck:
                 self.report_file.write("    無法生成更多候選碼，搜索結束。\n")
                 break
@@ -220,31 +630,59 @@ class UniqueKeyFinder:
                 break
             Lk_minus_1 = Lk
             
-        return solutions if solutions else None
+        return [self._mask_to_columns(sol) for sol in solutions] if solutions else None
+
+    def _mask_to_columns(self, mask: int) -> List[str]:
+        """將位元遮罩轉回欄位名稱清單 (依 sorted_columns 的順序)，只走訪被設定的位元。"""
+        columns = []
+        while mask:
+            lowest_bit = mask & -mask
+            columns.append(self.sorted_columns[lowest_bit.bit_length() - 1])
+            mask ^= lowest_bit
+        return columns
     
-    def _generate_candidates(self, Lk_minus_1: Set[FrozenSet[str]], k: int) -> Set[FrozenSet[str]]:
+    def _generate_candidates(self, Lk_minus_1: Set[int], solutions: List[int]) -> Set[int]:
         """Apriori-gen 函式的實現，用於生成候選碼。"""
-        return {s1.union(s2) for i, s1 in enumerate(sorted(list(Lk_minus_1))) for s2 in sorted(list(Lk_minus_1))[i+1:] if len(s1.union(s2)) == k}
+        # 以最高位元以外的位元作為前綴，join 只合併前綴相同的項目集；prune 剔除有子集不在 Lk_minus_1 中或為已知解超集的候選碼
+        groups: Dict[int, List[int]] = {}
+        for itemset in sorted(Lk_minus_1):
+            highest_bit = 1 << (itemset.bit_length() - 1)
+            groups.setdefault(itemset ^ highest_bit, []).append(highest_bit)
 
-    def _test_candidates(self, Ck: Set[FrozenSet[str]], solutions: List[List[str]], k: int) -> Set[FrozenSet[str]]:
+        Ck = set()
+        for prefix, tails in groups.items():
+            for first, second in itertools.combinations(tails, 2):
+                candidate = prefix | first | second
+                if any(candidate & sol == sol for sol in solutions):
+                    continue
+                # 去掉 first 或 second 的子集即為被合併的兩個項目集，只需檢查去掉前綴各位元的子集
+                remaining = prefix
+                while remaining:
+                    lowest_bit = remaining & -remaining
+                    if candidate ^ lowest_bit not in Lk_minus_1:
+                        break
+                    remaining ^= lowest_bit
+                else:
+                    Ck.add(candidate)
+        return Ck
+
+    def _test_candidates(self, Ck: Set[int], solutions: List[int], k: int) -> Set[int]:
         """測試一組候選碼，返回其中的非唯一鍵。"""
         Lk = set()
-        iterable = tqdm(sorted(list(Ck)), desc=f"測試長度 {k} ", unit=" 組") if TQDM_AVAILABLE else sorted(list(Ck))
-        for candidate_set in iterable:
-            candidate = list(candidate_set)
-            if any(set(sol).issubset(set(candidate)) for sol in solutions):
-                self.report_file.write(f"    > 跳過 (是已知解的超集): {candidate}\n")
-                continue
-            
+        masks = sorted(Ck)
+        candidates = [self._mask_to_columns(mask) for mask in masks]
+        results = self._iter_is_unique(candidates)
+        iterable = tqdm(results, total=len(candidates), desc=f"測試長度 {k} ", unit=" 組") if TQDM_AVAILABLE else results
+        for mask, candidate, is_unique in zip(masks, candidates, iterable):
             if TQDM_AVAILABLE: iterable.set_description(f"測試長度 {k}: {str(candidate)}")
             self.report_file.write(f"    > 測試: {candidate}\n")
             
-            if len(self.df[candidate].drop_duplicates()) == self.total_count:
-                solutions.append(candidate)
+            if is_unique:
+                solutions.append(mask)
                 logger.info(f"  > 找到一個最小唯一鍵: {candidate}")
                 self.report_file.write(f"    >> 找到解: {candidate}\n")
             else:
-                Lk.add(candidate_set)
+                Lk.add(mask)
         return Lk
 
     def _run_strategy_exhaustive(self) -> Optional[List[List[str]]]:
@@ -254,16 +692,49 @@ class UniqueKeyFinder:
             num_combinations = math.comb(len(self.sorted_columns), k)
             self.report_file.write(f"\n  >> 正在測試所有長度為 {k} 的組合 (總計: {num_combinations:,} 種) <<\n")
             
-            combinations_iterator = itertools.combinations(self.sorted_columns, k)
-            iterable = tqdm(combinations_iterator, total=num_combinations, desc=f"測試長度 {k} ", unit=" 組") if TQDM_AVAILABLE else combinations_iterator
-            
-            for columns_to_test in iterable:
-                current_combination = list(columns_to_test)
-                if TQDM_AVAILABLE: iterable.set_description(f"測試長度 {k}: {str(current_combination)}")
+            progress = tqdm(total=num_combinations, desc=f"測試長度 {k} ", unit=" 組") if TQDM_AVAILABLE else None
+            try:
+                # 組合依字典序編號，數量夠多時切分為編號區間平行測試，取得字典序最前的解後中止其餘區間
+                if self.n_jobs > 1 and num_combinations >= PARALLEL_MIN_CANDIDATES:
+                    solution = self._search_combinations_parallel(k, num_combinations, progress)
+                else:
+                    solution = self._search_combinations_serial(k, num_combinations, progress)
+            finally:
+                if progress is not None: progress.close()
+            if solution:
+                return [solution]
+        return None
+
+    def _search_combinations_serial(self, k: int, num_combinations: int, progress) -> Optional[List[str]]:
+        """在目前行程中依字典序逐批測試長度為 k 的組合，返回第一個唯一鍵。"""
+        combinations = _iter_combinations(len(self.sorted_columns), k, 0, num_combinations)
+        while True:
+            batch = [[self.sorted_columns[i] for i in positions] for positions in itertools.islice(combinations, HASH_BATCH_SIZE)]
+            if not batch:
+                return None
+            for current_combination, is_unique in zip(batch, self._iter_is_unique(batch)):
+                if progress is not None: progress.set_description(f"測試長度 {k}: {str(current_combination)}")
                 self.report_file.write(f"    > 測試: {current_combination}\n")
-                if len(self.df[current_combination].drop_duplicates()) == self.total_count:
-                    if TQDM_AVAILABLE: iterable.close()
-                    return [current_combination]
+                if is_unique:
+                    return current_combination
+                if progress is not None: progress.update()
+
+    def _search_combinations_parallel(self, k: int, num_combinations: int, progress) -> Optional[List[str]]:
+        """將長度為 k 的組合依編號區間分派給工作行程，返回字典序最前的唯一鍵。"""
+        n = len(self.sorted_columns)
+        col_indices = [self._col_index[col] for col in self.sorted_columns]
+        range_size = max(1, min(1024, math.ceil(num_combinations / (self.n_jobs * 4))))
+        tasks = [(col_indices, k, start, min(start + range_size, num_combinations)) for start in range(0, num_combinations, range_size)]
+
+        # imap 依區間順序返回結果，因此第一個找到解的區間即含有字典序最前的解
+        for (_, _, start, stop), found_rank in zip(tasks, self._get_pool().imap(_worker_first_unique, tasks)):
+            end = stop if found_rank is None else found_rank + 1
+            for positions in _iter_combinations(n, k, start, end):
+                self.report_file.write(f"    > 測試: {[self.sorted_columns[i] for i in positions]}\n")
+            if progress is not None: progress.update(end - start)
+            if found_rank is not None:
+                self._release_workers(terminate=True)
+                return [self.sorted_columns[i] for i in _unrank_combination(n, k, found_rank)]
         return None
 
     def _log_and_report_success(self) -> None:
@@ -272,11 +743,30 @@ class UniqueKeyFinder:
         logger.info(result_msg)
         self.report_file.write("\n" + result_msg + "\n")
 
+# --- 檔案層級平行處理 ---
+def _init_file_worker(log_queue: multiprocessing.Queue) -> None:
+    """檔案工作行程初始化：日誌改經由佇列交給主行程統一寫入，並關閉會互相覆蓋的進度條。"""
+    global TQDM_AVAILABLE # pylint: disable=global-statement
+    TQDM_AVAILABLE = False
+    # 檔案間已平行處理，Numba 核心只使用單一執行緒
+    if NUMBA_AVAILABLE:
+        set_num_threads(1)
+    for handler in list(logger.handlers):
+        logger.removeHandler(handler)
+    logger.addHandler(QueueHandler(log_queue))
+
+def _run_file(task: Tuple[str, List[Strategy]]) -> None:
+    """在檔案工作行程中分析單一檔案；檔案間已平行處理，因此候選碼測試不再另開行程。"""
+    file_path, strategy_order = task
+    UniqueKeyFinder(file_path, n_jobs=1).run(strategy_order=strategy_order)
+
 class DirectoryScanner:
     """掃描目錄，為每個符合條件的檔案建立並執行 UniqueKeyFinder。"""
-    def __init__(self, directory: str = '.', exclude_pattern: str = r'_header_\d+\.csv$'):
+    def __init__(self, directory: str = '.', exclude_pattern: str = r'_header_\d+\.csv$', max_workers: Optional[int] = None):
+        """初始化 DirectoryScanner。max_workers 為同時分析的檔案數上限，預設為 CPU 核心數。"""
         self.directory = directory
         self.exclude_pattern = re.compile(exclude_pattern, re.IGNORECASE)
+        self.max_workers = max_workers or os.cpu_count() or 1
         self.strategy_order = self._get_strategy_order()
 
     def _get_strategy_order(self) -> List[Strategy]:
@@ -290,11 +780,16 @@ class DirectoryScanner:
 
     def scan_and_process(self) -> None:
         """掃描並處理目錄中的所有合格檔案。"""
+        setup_logging()
         logger.info("===== 腳本開始執行 (V7.2 - 完整物件導向版) =====")
         if not TQDM_AVAILABLE:
             logger.warning("'tqdm' 模組未安裝。進度條將不會顯示。")
         if not PYFD_AVAILABLE:
             logger.warning("'pyfd' 函式庫未安裝，'super_smart' 策略將被跳過。")
+        if not PYARROW_AVAILABLE:
+            logger.warning("'pyarrow' 函式庫未安裝，CSV 欄位將以 pandas 預設的字串型別進行字典編碼。")
+        if not NUMBA_AVAILABLE:
+            logger.warning("'numba' 函式庫未安裝，資料列雜湊將改用 NumPy 計算。")
 
         logger.info(f"開始掃描目錄 '{os.path.abspath(self.directory)}'...")
         
@@ -310,13 +805,29 @@ class DirectoryScanner:
 
         logger.info(f"找到 {len(files_to_process)} 個檔案待處理: {files_to_process}")
 
-        for filename in files_to_process:
-            file_path = os.path.join(self.directory, filename)
-            finder = UniqueKeyFinder(file_path)
-            finder.run(strategy_order=self.strategy_order)
+        file_paths = [os.path.join(self.directory, filename) for filename in files_to_process]
+        max_workers = min(len(file_paths), self.max_workers)
+        if max_workers > 1:
+            self._process_in_parallel(file_paths, max_workers)
+        else:
+            for file_path in file_paths:
+                finder = UniqueKeyFinder(file_path)
+                finder.run(strategy_order=self.strategy_order)
         
         logger.info("===== 所有檔案均已分析完畢！ =====")
 
+    def _process_in_parallel(self, file_paths: List[str], max_workers: int) -> None:
+        """以多個行程同時分析多個檔案，工作行程的日誌經由 QueueListener 匯流到主日誌檔。"""
+        logger.info(f"以 {max_workers} 個行程平行分析檔案...")
+        log_queue = multiprocessing.Queue()
+        listener = QueueListener(log_queue, *logger.handlers, respect_handler_level=True)
+        listener.start()
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers, initializer=_init_file_worker, initargs=(log_queue,)) as executor:
+                list(executor.map(_run_file, [(file_path, self.strategy_order) for file_path in file_paths]))
+        finally:
+            listener.stop()
+
 if __name__ == "__main__":
     scanner = DirectoryScanner()
     scanner.scan_and_process()